@@ -1,37 +1,64 @@
 #!/usr/bin/env python3
 import datetime
+import heapq
+import lzma
 import os
-import subprocess
 import sys
-
-import yaml
+from tempfile import mkstemp
 
 import habitrpg
 
 BACKUP_DIRECTORY = os.path.expanduser(os.path.join('~', 'habitrpg_backup'))
 FILENAME_FORMAT = '{timestamp:%Y-%m-%d}'
 DEFAULT_FILES_TO_KEEP = 10
+BACKUP_CHUNK_SIZE = 64 * 1024
 
 def create_new_backup(user, backup_path, compress=True):
-    user_data = user.api_request('GET', 'user', decode=False).json()
-    with open(backup_path, 'w') as backup_file:
-        yaml.dump(user_data, backup_file)
+    # The API already gives us the user data as JSON, so store those bytes
+    # as-is rather than decoding them and re-encoding them in another format.
+    # Stream them to disk as they arrive, so we never need to hold the whole
+    # response in memory.
     if compress:
-        subprocess.check_call(('xz', backup_path))
+        backup_path += '.xz'
+    response = user.api_request('GET', 'user', decode=False, stream=True)
+    with response:
+        # Write to a temporary file then move it into place, else a download
+        # that fails part way through would leave a truncated backup, possibly
+        # replacing a good one from earlier in the day.  The leading `.` means
+        # delete_old_backups() ignores it.
+        temp_handle, temp_path = mkstemp(suffix='.tmp', prefix='.',
+                                         dir=os.path.dirname(backup_path))
+        try:
+            with os.fdopen(temp_handle, 'wb') as temp_file:
+                if compress:
+                    backup_file = lzma.open(temp_file, 'wb')
+                else:
+                    backup_file = temp_file
+                with backup_file:
+                    for chunk in response.iter_content(BACKUP_CHUNK_SIZE):
+                        backup_file.write(chunk)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    os.replace(temp_path, backup_path)
 
 
 def delete_old_backups(directory, num_files_to_keep):
     # Get a list of files (not directories/other) in the specified directory,
     # excluding ones starting with a `.`, since they're presumably temporary
-    # files anyway.
-    file_list = [os.path.join(directory, f) for f in os.listdir(directory) if
-                 os.path.isfile(os.path.join(directory, f)) and
-                 not f.startswith('.')]
-    sorted_file_list = sorted(file_list,
-                              key=lambda x: os.stat(x).st_mtime,
-                              reverse=True)
-    for file_name in sorted_file_list[num_files_to_keep:]:
-        os.unlink(file_name)
+    # files anyway.  Use os.scandir() so we can use the file type information
+    # from the directory listing rather than stat-ing every entry ourselves.
+    with os.scandir(directory) as dir_entries:
+        file_list = [entry for entry in dir_entries if
+                     entry.is_file() and not entry.name.startswith('.')]
+    # We only need to know which files are the newest few, so there's no need
+    # to sort the entire list.
+    files_to_keep = heapq.nlargest(num_files_to_keep, file_list,
+                                   key=lambda x: x.stat().st_mtime)
+    paths_to_keep = {entry.path for entry in files_to_keep}
+    for entry in file_list:
+        if entry.path not in paths_to_keep:
+            os.unlink(entry.path)
 
 
 if __name__ == '__main__':
@@ -14,6 +14,8 @@ import habitrpg
 if __name__ == '__main__':
     user = habitrpg.User.from_file()
     user.fetch_tasks()
-    for daily in user.dailies:
-        daily.update(completed=False,
-                     checklist=[(c.text, False) for c in daily.checklist])
+    user.batch_update(
+            (daily, {'completed': False,
+                     'checklist': daily._checklist_request(
+                             (item.text, False) for item in daily.checklist)})
+            for daily in user.dailies)
@@ -22,16 +22,19 @@ Constants
 
 -   DEFAULT_API_BASE_URI: The URI of the standard public HabitRPG API.
 -   DEFAULT_LOGIN_FILE: The default location for storing API login details.
+-   TASK_CLASSES: A mapping from API task type strings to task classes.
 
 Functions
 ---------
 
 -   create_login_file: Create a file containing login information.
 -   parse_possible_timestamp: Parse a timestamp string from an API response.
+-   format_timestamp: Format a timestamp for sending in an API request.
 
 Classes
 -------
 
+-   ResponseDictReader: A CSV reader over a streamed API response.
 -   HabitRPG: A HabitRPG site, e.g. the main site or the beta site.
 -   User: A specific user login.
 -   Habit: An entry from the HabitRPG "Habits" list.
@@ -46,13 +49,28 @@ Classes
 -   ChatMessage: A message in a guild/party chat log.
 
 """
-import json
 import os.path
 import datetime
+import sys
 from csv import DictReader
-from io import StringIO
+from io import StringIO, TextIOWrapper
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    import json
+
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+
+    json_loads = json.loads
+else:
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
 
 DEFAULT_API_BASE_URI = 'https://habitrpg.com/api/v2'
 DEFAULT_LOGIN_FILE = os.path.expanduser(os.path.join('~', '.habitrpg'))
@@ -67,14 +85,71 @@ def parse_possible_timestamp(timestamp):
     if timestamp is None:
         return None
     else:
-        return (datetime.datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%fZ')
-                .replace(tzinfo=datetime.timezone.utc))
+        # Timestamps look like "2014-06-01T12:34:56.789Z".  fromisoformat() is
+        # much faster than strptime(), but before Python 3.11 it doesn't
+        # understand the "Z" suffix, so give it an explicit UTC offset.
+        return datetime.datetime.fromisoformat(timestamp.replace('Z',
+                                                                 '+00:00'))
+
+
+def format_timestamp(timestamp):
+    # Equivalent to `timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')`, but
+    # without going through strftime's format string handling.  Like
+    # strftime, treat a plain date as midnight.
+    if not isinstance(timestamp, datetime.datetime):
+        return (f'{timestamp.year:04d}-{timestamp.month:02d}-'
+                f'{timestamp.day:02d}T00:00:00.000000Z')
+    return (f'{timestamp.year:04d}-{timestamp.month:02d}-{timestamp.day:02d}T'
+            f'{timestamp.hour:02d}:{timestamp.minute:02d}:'
+            f'{timestamp.second:02d}.{timestamp.microsecond:06d}Z')
+
+
+class ResponseDictReader(DictReader):
+    # A csv.DictReader that reads a streamed CSV response as it arrives.  The
+    # response's connection is released once every row has been read; call
+    # close(), or use the reader as a context manager, to release it early.
+    def __init__(self, response, **kwargs):
+        self.response = response
+        super().__init__(TextIOWrapper(response.raw,
+                                       encoding=response.encoding or 'utf-8',
+                                       newline=''),
+                         **kwargs)
+
+    def __next__(self):
+        try:
+            return super().__next__()
+        except StopIteration:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.response.close()
 
 
 class HabitRPG(object):
     def __init__(self, uri=DEFAULT_API_BASE_URI):
         self.uri = uri
         self.session = requests.Session()
+        # Retry idempotent requests that fail because the server is briefly
+        # unavailable or rate limiting us, rather than giving up at the first
+        # hiccup.  Leave reporting any final failure to
+        # `response.raise_for_status()`.
+        retries = Retry(total=3, backoff_factor=0.3,
+                        status_forcelist=(429, 502, 503, 504),
+                        raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # The game content and user model only change when the site is
+        # updated, so remember them rather than fetching them every time.
+        self.content_cache = {}
+        self.user_model_cache = None
 
     def __eq__(self, other):
         try:
@@ -91,28 +166,48 @@ class HabitRPG(object):
         else:
             return '{}({!r})'.format(self.__class__.__name__, self.uri)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        # Close any connections the session is holding open for reuse.
+        self.session.close()
+
     def api_request(self, method, path, headers=None, body=None, params=None,
-                    raise_status=True, decode=True):
+                    raise_status=True, decode=True, stream=False):
         if body is not None:
-            body = json.dumps(body)
+            body = json_dumps(body)
             if headers is None:
                 headers = {'content-type': 'application/json'}
-            else:
+            elif headers.get('content-type') != 'application/json':
+                # Don't modify the dictionary we were passed, as the caller
+                # may be reusing it.
+                headers = dict(headers)
                 headers['content-type'] = 'application/json'
 
         response = self.session.request(method,
-                                        '{}/{}'.format(self.uri, path),
+                                        f'{self.uri}/{path}',
                                         headers=headers,
                                         data=body,
-                                        params=params)
+                                        params=params,
+                                        stream=stream)
 
         if raise_status:
-            response.raise_for_status()
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                # If the response is being streamed, nobody is going to read
+                # the rest of it now, so release the connection for reuse.
+                response.close()
+                raise
 
         if decode and response.status_code != 204:
             content_type = response.headers['content-type']
             if content_type.startswith('application/json;'):
-                return response.json()
+                return json_loads(response.content)
             elif content_type.startswith('text/csv;'):
                 stream = StringIO(response.text)  # Needed for csv.DictReader
                 return DictReader(stream)
@@ -128,26 +223,36 @@ class HabitRPG(object):
         return self.api_request('GET', 'status')['status']
 
     def content(self, language=None):
+        try:
+            return self.content_cache[language]
+        except KeyError:
+            pass
         if language is not None:
             body = {'language': language}
         else:
             body = None
-        return self.api_request('GET', 'content', body=body)
+        content = self.api_request('GET', 'content', body=body)
+        self.content_cache[language] = content
+        return content
 
     def user_model(self):
-        return self.api_request('GET', 'content/paths')
+        if self.user_model_cache is None:
+            self.user_model_cache = self.api_request('GET', 'content/paths')
+        return self.user_model_cache
 
 
 class User(object):
     def __init__(self, hrpg, user_id, api_token):
         self.hrpg = hrpg
-        self.user_id = user_id
-        self.api_token = api_token
+        self._user_id = user_id
+        self._api_token = api_token
+        self._build_auth_headers()
         self.habits = []
         self.dailies = []
         self.todos = []
         self.rewards = []
         self.tasks_populated = False
+        self.tasks_etag = None
         self.tags = []
         self.tag_ids = {}
         self.tags_populated = False
@@ -169,103 +274,160 @@ class User(object):
                                              self.user_id,
                                              self.api_token)
 
+    # Build the request headers once, rather than for every request, but
+    # rebuild them if the credentials change so they never go stale.
+    def _build_auth_headers(self):
+        self.auth_headers = {'x-api-user': self._user_id,
+                             'x-api-key': self._api_token}
+        self.auth_json_headers = dict(self.auth_headers)
+        self.auth_json_headers['content-type'] = 'application/json'
+
+    @property
+    def user_id(self):
+        return self._user_id
+
+    @user_id.setter
+    def user_id(self, user_id):
+        self._user_id = user_id
+        self._build_auth_headers()
+
+    @property
+    def api_token(self):
+        return self._api_token
+
+    @api_token.setter
+    def api_token(self, api_token):
+        self._api_token = api_token
+        self._build_auth_headers()
+
     @classmethod
     def from_file(cls, hrpg=None, file_path=DEFAULT_LOGIN_FILE):
         if hrpg is None:
             hrpg = HabitRPG()
         with open(file_path) as login_file:
-            user_id = login_file.readline().strip()
-            api_token = login_file.readline().strip()
+            user_id, api_token = login_file.read().split()[:2]
         return cls(hrpg, user_id, api_token)
 
     def api_request(self, method, path, body=None, params=None,
-                    raise_status=True, decode=True):
-        headers = {'x-api-user': self.user_id,
-                   'x-api-key': self.api_token}
+                    raise_status=True, decode=True, stream=False):
+        if body is None:
+            headers = self.auth_headers
+        else:
+            headers = self.auth_json_headers
         return self.hrpg.api_request(method, path, headers, body, params,
-                                     raise_status, decode)
+                                     raise_status, decode, stream)
 
     def history(self):
-        return self.api_request('GET', 'export/history')
+        # The history export can be large, so parse it as it arrives rather
+        # than holding the whole thing in memory first.
+        response = self.api_request('GET', 'export/history', decode=False,
+                                    stream=True)
+        content_type = response.headers['content-type']
+        if not content_type.startswith('text/csv;'):
+            response.close()
+            raise RuntimeError('Content type "{}" unrecognized'
+                               .format(content_type))
+        response.raw.decode_content = True
+        # Without this, urllib3 reports the stream as closed as soon as it's
+        # read the whole body, and TextIOWrapper then refuses to hand over
+        # the lines it still has buffered.
+        response.raw.auto_close = False
+        return ResponseDictReader(response)
 
     def fetch(self):
-        response = self.api_request('GET', 'user')
+        self.populate_from_api_response(self.api_request('GET', 'user'))
 
+    def populate_from_api_response(self, api_response):
         self.habits = [Habit.create_from_api_response(self, task_data) for
-                       task_data in response['habits']]
+                       task_data in api_response['habits']]
         self.dailies = [Daily.create_from_api_response(self, task_data) for
-                        task_data in response['dailys']]
+                        task_data in api_response['dailys']]
         self.todos = [Todo.create_from_api_response(self, task_data) for
-                      task_data in response['todos']]
+                      task_data in api_response['todos']]
         self.rewards = [Reward.create_from_api_response(self, task_data) for
-                        task_data in response['rewards']]
+                        task_data in api_response['rewards']]
         self.tasks_populated = True
 
-        self.populate_tags_from_api_response(response['tags'])
+        self.populate_tags_from_api_response(api_response['tags'])
+
+    def fetch_tags(self):
+        # Fetch just the tag list, rather than the entire user document.
+        self.populate_tags_from_api_response(
+                self.api_request('GET', 'user/tags'))
+
+    def batch_update(self, updates):
+        # Send several task updates in a single API call, rather than one call
+        # per task.  `updates` is an iterable of (task, request) pairs, where
+        # `request` is the same request dictionary that would be passed to
+        # `Task.update()`.  The API responds with the full user data, so use
+        # that to refresh everything we know about.  That rebuilds the user's
+        # task lists from scratch, so also refresh the task objects we were
+        # given in place, the same as `Task.update()` would.
+        updates = list(updates)
+        operations = [{'op': 'updateTask',
+                       'params': {'id': task.id_code},
+                       'body': request}
+                      for task, request in updates]
+        response = self.api_request('POST', 'user/batch-update', operations)
+        self.populate_from_api_response(response)
+        task_data_by_id = {task_data['id']: task_data for task_type in
+                           ('habits', 'dailys', 'todos', 'rewards') for
+                           task_data in response[task_type]}
+        for task, request in updates:
+            task.populate_from_api_response(task_data_by_id[task.id_code])
 
     def populate_tags_from_api_response(self, api_response):
-        # Before populating the tag list, spin through any tags we know about
-        # already and assume they've been deleted.  They'll be marked as not
-        # being deleted when we process them (unless we don't process them on
-        # the API response, which means they will, in fact, have been deleted.
-        #
-        # Use self.tag_ids.values() for this, because self.tags does only
-        # contain tags we believe were not deleted last time we checked.
-        updated_tags = set()
-        for tag in self.tag_ids.values():
-            if not tag.deleted:
-                tag.deleted = True
-                updated_tags.add(tag)
-
-        try:
-            self.tags = [Tag.create_from_api_response(self, tag_data) for
-                         tag_data in api_response]
-        except:
-            # Something went wrong, and since we changed some values earlier
-            # and now don't know whether they're in a good state, reset them.
-            for tag in updated_tags:
-                tag.populated = False
-            raise
-
-        # Now any tags that aren't populated in self.tag_ids must be ones that
-        # aren't current tags but are being referred to from somewhere, so
-        # record them as being deleted.
-        for tag in self.tag_ids.values():
-            if not tag.populated:
+        # Populating a tag from the API response marks it as not deleted, so
+        # if this fails part way through, every tag is still in a sensible
+        # state: the ones we've processed are current, and the rest still have
+        # whatever state they had before.
+        self.tags = [Tag.create_from_api_response(self, tag_data) for
+                     tag_data in api_response]
+
+        # Any other tags in self.tag_ids must be ones that aren't current tags
+        # but are being referred to from somewhere, or were current last time
+        # we checked, so record them as being deleted.
+        current_tag_ids = {tag.id_code for tag in self.tags}
+        for id_code, tag in self.tag_ids.items():
+            if id_code not in current_tag_ids:
                 tag.deleted = True
                 tag.populated = True
 
         self.tags_populated = True
 
     def task_from_api_response(self, api_response):
-        task_type = api_response['type']
-        for task_class in Habit, Daily, Todo, Reward:
-            if task_type == task_class.task_type:
-                return task_class.create_from_api_response(self, api_response)
-        raise KeyError(task_type)  # No match
+        task_class = TASK_CLASSES[api_response['type']]
+        return task_class.create_from_api_response(self, api_response)
 
     def fetch_tasks(self):
-        tasks = [self.task_from_api_response(task_data) for task_data in
-                 self.api_request('GET', 'user/tasks')]
-        self.habits = []
-        self.dailies = []
-        self.todos = []
-        self.rewards = []
-        for task in tasks:
-            if isinstance(task, Habit):
-                self.habits.append(task)
-            elif isinstance(task, Daily):
-                self.dailies.append(task)
-            elif isinstance(task, Todo):
-                self.todos.append(task)
-            elif isinstance(task, Reward):
-                self.rewards.append(task)
-            else:
-                raise ValueError('Unexpected task {!r}'.format(task))
+        # If we already have the task lists, ask the API to only send them
+        # again if they've changed since we last fetched them.
+        headers = self.auth_headers
+        if self.tasks_populated and self.tasks_etag is not None:
+            headers = dict(headers)
+            headers['if-none-match'] = self.tasks_etag
+        response = self.hrpg.api_request('GET', 'user/tasks', headers,
+                                         decode=False)
+        if response.status_code == 304:  # Not Modified
+            return
+        self.tasks_etag = response.headers.get('etag')
+
+        # Sort the tasks into their lists as we create them, rather than
+        # building a list of all tasks and then sorting through it.
+        task_lists = {'habit': [], 'daily': [], 'todo': [], 'reward': []}
+        for task_data in json_loads(response.content):
+            task_lists[task_data['type']].append(
+                    self.task_from_api_response(task_data))
+        self.habits = task_lists['habit']
+        self.dailies = task_lists['daily']
+        self.todos = task_lists['todo']
+        self.rewards = task_lists['reward']
         self.tasks_populated = True
 
 
 class UserPlusIDMixin(object):
+    __slots__ = ('user', 'id_code', 'populated')
+
     def __init__(self, user, id_code):
         self.user = user
         self.id_code = id_code
@@ -296,6 +458,9 @@ class UserPlusIDMixin(object):
 
 
 class Task(UserPlusIDMixin):
+    __slots__ = ('title', 'notes', 'date_created', 'value', 'priority',
+                 'attribute', 'challenge', 'tags')
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if not self.populated:
@@ -318,7 +483,7 @@ class Task(UserPlusIDMixin):
 
     def fetch(self):
         task_data = self.user.api_request('GET',
-                                          'user/tasks/{}'.format(self.id_code))
+                                          f'user/tasks/{self.id_code}')
         self.populate_from_api_response(task_data)
 
     def populate_from_api_response(self, api_response):
@@ -331,25 +496,24 @@ class Task(UserPlusIDMixin):
                 api_response['dateCreated'])
         self.value = api_response['value']
         self.priority = api_response['priority']
-        self.attribute = api_response['attribute']
+        # There are only a handful of attributes, so share a single string for
+        # each rather than keeping a separate copy for every task.  The API
+        # may not give an attribute at all, though.
+        attribute = api_response['attribute']
+        if attribute is not None:
+            attribute = sys.intern(attribute)
+        self.attribute = attribute
         self.challenge = api_response.get('challenge')  # TODO Parse this
 
-        tags = api_response.get('tags', {})
-        self.tags = []
-        for tag_id in tags:
-            # tags[tag_id] will be True or False, where False indicates the tag
-            # was once set on this task, but isn't set now.
-            if tags[tag_id]:
-                self.tags.append(Tag(self.user, tag_id))
+        # Each tag ID maps to True or False, where False indicates the tag was
+        # once set on this task, but isn't set now.
+        self.tags = [Tag(self.user, tag_id) for tag_id, is_set in
+                     api_response.get('tags', {}).items() if is_set]
 
         self.populated = True
 
-    @classmethod
-    def new(cls, user, *, request=None, title=None, notes=None, value=None,
-            priority=None, tags=None):
-        if request is None:
-            request = {}
-        request['type'] = cls.task_type
+    @staticmethod
+    def _add_fields_to_request(request, title, notes, value, priority):
         if title is not None:
             request['text'] = title
         if notes is not None:
@@ -358,10 +522,16 @@ class Task(UserPlusIDMixin):
             request['value'] = value
         if priority is not None:
             request['priority'] = priority
+
+    @classmethod
+    def new(cls, user, *, request=None, title=None, notes=None, value=None,
+            priority=None, tags=None):
+        if request is None:
+            request = {}
+        request['type'] = cls.task_type
+        cls._add_fields_to_request(request, title, notes, value, priority)
         if tags is not None:
-            request['tags'] = {}
-            for tag in tags:
-                request['tags'][tag.id_code] = True
+            request['tags'] = {tag.id_code: True for tag in tags}
 
         response = user.api_request('POST', 'user/tasks', request)
         return cls.create_from_api_response(user, response)
@@ -370,14 +540,7 @@ class Task(UserPlusIDMixin):
                priority=None, tags=None):
         if request is None:
             request = {}
-        if title is not None:
-            request['text'] = title
-        if notes is not None:
-            request['notes'] = notes
-        if value is not None:
-            request['value'] = value
-        if priority is not None:
-            request['priority'] = priority
+        self._add_fields_to_request(request, title, notes, value, priority)
         if tags is not None:
             # It's not possible to remove a tag from a task: once it has been
             # added, it will be present forever.  Untagging the task is
@@ -389,55 +552,58 @@ class Task(UserPlusIDMixin):
             # which should be implicit.  So let the user of this method specify
             # the list of tags they want the task to have, and we'll work out
             # what that means in terms of marking tags as present or absent.
-            request['tags'] = {}
-            for tag in self.tags:
-                # Assume the tag is going to be deleted...
-                request['tags'][tag.id_code] = False
-
-            for tag in tags:
-                # ...unless it's in the passed list, in which case mark it as
-                # present.
-                request['tags'][tag.id_code] = True
+            #
+            # Assume each current tag is going to be deleted, unless it's in
+            # the passed list, in which case mark it as present.
+            request['tags'] = {tag.id_code: False for tag in self.tags}
+            request['tags'].update((tag.id_code, True) for tag in tags)
 
         response = self.user.api_request(
-                'PUT', 'user/tasks/{}'.format(self.id_code), request)
+                'PUT', f'user/tasks/{self.id_code}', request)
         self.populate_from_api_response(response)
 
     def delete(self):
         # After calling this, remember to call User.fetch_tasks() if the task
         # lists need updating.
-        self.user.api_request('DELETE', 'user/tasks/{}'.format(self.id_code))
+        self.user.api_request('DELETE', f'user/tasks/{self.id_code}')
 
     def _up(self, update=False):
-        self.user.api_request('POST', 'user/tasks/{}/up'.format(self.id_code))
+        self.user.api_request('POST', f'user/tasks/{self.id_code}/up')
         if update:
             self.fetch()
 
     def _down(self, update=False):
-        self.user.api_request('POST',
-                              'user/tasks/{}/down'.format(self.id_code))
+        self.user.api_request('POST', f'user/tasks/{self.id_code}/down')
         if update:
             self.fetch()
 
 
 class CompletableTaskMixin(object):
+    # The attributes this mixin sets are listed in the concrete task classes'
+    # __slots__, since a class can't have more than one base with non-empty
+    # __slots__.
+    __slots__ = ()
+
     def populate_from_api_response(self, api_response):
         self.completed = api_response['completed']
         super().populate_from_api_response(api_response)
 
+    @staticmethod
+    def _add_completed_to_request(request, completed):
+        if completed is not None:
+            request['completed'] = completed
+
     @classmethod
     def new(cls, user, *, request=None, completed=None, **kwargs):
         if request is None:
             request = {}
-        if completed is not None:
-            request['completed'] = completed
+        cls._add_completed_to_request(request, completed)
         return super().new(user, request=request, **kwargs)
 
     def update(self, request=None, completed=None, **kwargs):
         if request is None:
             request = {}
-        if completed is not None:
-            request['completed'] = completed
+        self._add_completed_to_request(request, completed)
         return super().update(request, **kwargs)
 
     def complete(self, *args, **kwargs):
@@ -448,6 +614,8 @@ class CompletableTaskMixin(object):
 
 
 class ChecklistTaskMixin(object):
+    __slots__ = ()
+
     def populate_from_api_response(self, api_response):
         # Both 'checklist' and 'collapseChecklist' may be missing from the API
         # response.  We test explicitly for the former case, and in the latter
@@ -463,25 +631,24 @@ class ChecklistTaskMixin(object):
         self.collapse_checklist = api_response.get('collapseChecklist')
         super().populate_from_api_response(api_response)
 
+    @staticmethod
+    def _checklist_request(checklist):
+        return [{'text': text, 'completed': completed} for
+                text, completed in checklist]
+
     @classmethod
     def new(cls, user, *, request=None, checklist=None, **kwargs):
         if request is None:
             request = {}
         if checklist is not None:
-            request['checklist'] = []
-            for text, completed in checklist:
-                request['checklist'].append({'text': text,
-                                             'completed': completed})
+            request['checklist'] = cls._checklist_request(checklist)
         return super().new(user, request=request, **kwargs)
 
     def update(self, request=None, checklist=None, **kwargs):
         if request is None:
             request = {}
         if checklist is not None:
-            request['checklist'] = []
-            for text, completed in checklist:
-                request['checklist'].append({'text': text,
-                                             'completed': completed})
+            request['checklist'] = self._checklist_request(checklist)
         return super().update(request=request, **kwargs)
 
     @classmethod
@@ -501,13 +668,28 @@ class ChecklistTaskMixin(object):
 
 
 class HistoryTaskMixin(object):
+    __slots__ = ()
+
     def populate_from_api_response(self, api_response):
-        self.history = [HistoryStamp.create_from_api_response(hist_item) for
-                        hist_item in api_response['history']]
+        # A long-lived task can have a very long history, and most users of
+        # this module never look at it, so hold on to the raw API data and
+        # only create the HistoryStamp objects when they're asked for.  Keep
+        # the raw data afterwards too, for callers that want to work with it
+        # directly.
+        self.history_data = api_response['history']
+        self._history = None
         super().populate_from_api_response(api_response)
 
+    @property
+    def history(self):
+        if self._history is None:
+            self._history = [HistoryStamp.create_from_api_response(hist_item)
+                             for hist_item in self.history_data]
+        return self._history
+
 
 class Habit(HistoryTaskMixin, Task):
+    __slots__ = ('history_data', '_history', 'can_plus', 'can_minus')
     task_type = 'habit'
 
     def populate_from_api_response(self, api_response):
@@ -515,23 +697,24 @@ class Habit(HistoryTaskMixin, Task):
         self.can_minus = api_response['down']
         super().populate_from_api_response(api_response)
 
-    @classmethod
-    def new(cls, user, *, request=None, can_up=None, can_down=None, **kwargs):
-        if request is None:
-            request = {}
+    @staticmethod
+    def _add_directions_to_request(request, can_up, can_down):
         if can_up is not None:
             request['up'] = can_up
         if can_down is not None:
             request['down'] = can_down
+
+    @classmethod
+    def new(cls, user, *, request=None, can_up=None, can_down=None, **kwargs):
+        if request is None:
+            request = {}
+        cls._add_directions_to_request(request, can_up, can_down)
         return super().new(user, request=request, **kwargs)
 
     def update(self, request=None, can_up=None, can_down=None, **kwargs):
         if request is None:
             request = {}
-        if can_up is not None:
-            request['up'] = can_up
-        if can_down is not None:
-            request['down'] = can_down
+        self._add_directions_to_request(request, can_up, can_down)
         return super().update(request, **kwargs)
 
     def up(self, *args, **kwargs):
@@ -542,6 +725,8 @@ class Habit(HistoryTaskMixin, Task):
 
 
 class Daily(CompletableTaskMixin, ChecklistTaskMixin, HistoryTaskMixin, Task):
+    __slots__ = ('completed', 'checklist', 'collapse_checklist',
+                 'history_data', '_history', 'streak', 'repeat')
     task_type = 'daily'
 
     def populate_from_api_response(self, api_response):
@@ -551,37 +736,32 @@ class Daily(CompletableTaskMixin, ChecklistTaskMixin, HistoryTaskMixin, Task):
 
 
 class Todo(CompletableTaskMixin, ChecklistTaskMixin, Task):
+    __slots__ = ('completed', 'checklist', 'collapse_checklist', 'due_date',
+                 'date_completed')
     task_type = 'todo'
 
+    @staticmethod
+    def _add_dates_to_request(request, due_date, date_completed):
+        if due_date is not None:
+            # TODO: Check the behaviour here emulates the website's behaviour
+            # with regard to timezones.
+            request['date'] = format_timestamp(due_date)
+        if date_completed is not None:
+            request['dateCompleted'] = format_timestamp(date_completed)
+
     @classmethod
     def new(cls, user, *, request=None, due_date=None, date_completed=None,
             **kwargs):
         if request is None:
             request = {}
-        if due_date is not None:
-            # TODO: Check the behaviour here emulates the website's behaviour
-            # with regard to timezones.
-            request['date'] = due_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-        if date_completed is not None:
-            request['dateCompleted'] = (
-                date_completed.strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
+        cls._add_dates_to_request(request, due_date, date_completed)
         return super().new(user, request=request, **kwargs)
 
     def update(self, request=None, due_date=None, date_completed=None,
                **kwargs):
         if request is None:
             request = {}
-        if due_date is not None:
-            # TODO: Check the behaviour here emulates the website's behaviour
-            # with regard to timezones.
-            #
-            # TODO: This code is probably substantive enough to commonalize it
-            # with the code from Todo.new().  Although that probably applies to
-            # all the new/update methods, really.
-            request['date'] = due_date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-        if date_completed is not None:
-            request['dateCompleted'] = (
-                date_completed.strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
+        self._add_dates_to_request(request, due_date, date_completed)
         return super().update(request, **kwargs)
 
     def populate_from_api_response(self, api_response):
@@ -595,13 +775,20 @@ class Todo(CompletableTaskMixin, ChecklistTaskMixin, Task):
 
 
 class Reward(Task):
+    __slots__ = ()
     task_type = 'reward'
 
     def buy(self, *args, **kwargs):
         return self._up(*args, **kwargs)
 
 
+TASK_CLASSES = {task_class.task_type: task_class for
+                task_class in (Habit, Daily, Todo, Reward)}
+
+
 class HistoryStamp(object):
+    __slots__ = ('timestamp', 'value')
+
     def __init__(self, timestamp, value):
         self.timestamp = timestamp
         self.value = value
@@ -624,11 +811,14 @@ class HistoryStamp(object):
     @classmethod
     def create_from_api_response(cls, api_response):
         return cls(
-            datetime.datetime.fromtimestamp(api_response['date'] / 1000),
+            datetime.datetime.fromtimestamp(api_response['date'] / 1000,
+                                            datetime.timezone.utc),
             api_response['value'])
 
 
 class Tag(UserPlusIDMixin):
+    __slots__ = ('name', 'challenge', 'deleted')
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if not self.populated:
@@ -675,8 +865,8 @@ class Tag(UserPlusIDMixin):
 
     def fetch(self):
         # There's no good way to just fetch this tag, so just fetch all the
-        # user data, which will include tag data.
-        self.user.fetch()
+        # tags.
+        self.user.fetch_tags()
 
     @classmethod
     def new(cls, user, name=None):
@@ -693,11 +883,13 @@ class Tag(UserPlusIDMixin):
 
     def delete(self):
         response = self.user.api_request('DELETE',
-                                         'user/tags/{}'.format(self.id_code))
+                                         f'user/tags/{self.id_code}')
         self.user.populate_tags_from_api_response(response)
 
 
 class CheckItem(UserPlusIDMixin):
+    __slots__ = ('task', 'text', 'completed')
+
     def __init__(self, user, task, id_code):
         self.task = task
         super().__init__(user, id_code)
@@ -734,7 +926,7 @@ class CheckItem(UserPlusIDMixin):
 
 class Group(UserPlusIDMixin):
     def send_chat(self, message):
-        self.user.api_request('POST', 'groups/{}/chat'.format(self.id_code),
+        self.user.api_request('POST', f'groups/{self.id_code}/chat',
                               params={'message': message})
 
 
@@ -751,4 +943,4 @@ class ChatMessage(UserPlusIDMixin):
     def delete(self):
         self.user.api_request(
                 'DELETE',
-                'groups/{}/chat/{}'.format(self.group.id_code, self.id_code))
+                f'groups/{self.group.id_code}/chat/{self.id_code}')
@@ -11,16 +11,20 @@ CLEAR_THRESHOLD = 18
 TASK_NAME = 'Cut the todo list down to ≤{} tasks'.format(CLEAR_THRESHOLD)
 TZ = timezone('Europe/London')
 
-def find_incomplete_todos(todos):
-    return [todo for todo in todos if not todo.completed]
-
-def find_reduce_task(todos):
-    try:
-        return next((todo for todo in todos if todo.title == TASK_NAME))
-    except StopIteration:  # No such task
-        return None
-
-def create_update_reduce_task(reduce_task, num_todos, print_count=True):
+def count_todos_find_reduce_task(todos):
+    # Count the incomplete todos and look for the reduce task in a single
+    # pass.  We need the full count for the task notes, so there's no
+    # stopping early once the reduce task has been found.
+    num_todos = 0
+    reduce_task = None
+    for todo in todos:
+        if not todo.completed:
+            num_todos += 1
+            if reduce_task is None and todo.title == TASK_NAME:
+                reduce_task = todo
+    return num_todos, reduce_task
+
+def create_update_reduce_task(user, reduce_task, num_todos, print_count=True):
     notes = '{:%A %I:%M %p}: {} tasks'.format(datetime.now(TZ), num_todos)
     if print_count and sys.stdout.isatty():
         print(notes)
@@ -36,7 +40,6 @@ if __name__ == '__main__':
     user = habitrpg.User.from_file()
     user.fetch_tasks()
 
-    incomplete_todos = find_incomplete_todos(user.todos)
-    reduce_task = find_reduce_task(incomplete_todos)
+    num_todos, reduce_task = count_todos_find_reduce_task(user.todos)
 
-    create_update_reduce_task(reduce_task, len(incomplete_todos))
+    create_update_reduce_task(user, reduce_task, num_todos)
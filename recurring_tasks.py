@@ -6,6 +6,11 @@ from tempfile import mkstemp
 
 import yaml
 from pytz import timezone
+try:
+    # Use the libyaml bindings if they're available, as they're much faster.
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 
 import habitrpg
 
@@ -44,12 +49,27 @@ def create_recurring_task(title, filename, comp_min, comp_max, del_min,
     else:
         task_data['checklist'] = checklist
     file_path = os.path.join(TASK_DIRECTORY, filename)
-    with open(file_path, 'w') as task_file:
-        yaml.safe_dump(task_data, task_file, default_flow_style=False)
+    task_yaml = dump_task_data(task_data)
+    with open(file_path, 'wb') as task_file:
+        task_file.write(task_yaml)
+
+# Serialise task data the same way everywhere, so a file written by
+# create_recurring_task() compares equal to the same data dumped by the main
+# script.
+def dump_task_data(task_data):
+    return yaml.dump(task_data, Dumper=SafeDumper, default_flow_style=False,
+                     encoding='utf-8')
+
+# Mark a naive timestamp loaded from YAML as being in UTC.  Pass None and
+# timestamps that already have a UTC offset through unchanged.
+def as_utc(timestamp):
+    if timestamp is None or timestamp.tzinfo is not None:
+        return timestamp
+    return timestamp.replace(tzinfo=datetime.timezone.utc)
 
 def get_recurring_tag(user):
     if not user.tags_populated:
-        user.fetch()
+        user.fetch_tags()
     for tag in user.tags:
         if tag.name == RECURRING_TAG_NAME:
             recurring_tag = tag
@@ -60,43 +80,51 @@ def get_recurring_tag(user):
 
 if __name__ == '__main__':
     user = habitrpg.User.from_file()
-    for filename in os.listdir(TASK_DIRECTORY):
-        if filename.startswith('.') or filename.endswith('~'):
-            # Skip things like Vim swap files.
-            continue
-        file_path = os.path.join(TASK_DIRECTORY, filename)
-        with open(file_path) as task_file:
-            task_data = yaml.safe_load(task_file)
-
-        # Fix up any timestamps, because YAML's loader automatically converts
-        # them to UTC and removes any timezone information (including the fact
-        # that they're now UTC), meaning datetime comparisons don't work
-        # against timestamps from the HabitRPG API, which do include timezone
-        # information.
+    # Use a single time for the entire run; it's quick enough that this makes
+    # no practical difference.
+    now = datetime.datetime.now(TZ)
+    # Fetch all the todos at once, rather than fetching each recurring task's
+    # current todo separately.
+    user.fetch_tasks()
+    todos = {todo.id_code: todo for todo in user.todos}
+    # Only look up the recurring tag if we need it, and then only once.
+    recurring_tag = None
+    # Use os.scandir() so the directory listing gives us full paths and file
+    # types without any further work per entry.  Skip things like Vim swap
+    # files.
+    with os.scandir(TASK_DIRECTORY) as dir_entries:
+        task_files = [entry for entry in dir_entries if
+                      entry.is_file() and not entry.name.startswith('.') and
+                      not entry.name.endswith('~')]
+    for entry in task_files:
+        filename = entry.name
+        file_path = entry.path
+        # Read the whole file in one go, so the YAML parser works on a
+        # single buffer rather than reading the file in small pieces.
+        with open(file_path, 'rb') as task_file:
+            old_task_yaml = task_file.read()
+        task_data = yaml.load(old_task_yaml, Loader=SafeLoader)
+
+        # Fix up any naive timestamps.  Older versions of YAML's loader
+        # convert timestamps to UTC and remove any timezone information
+        # (including the fact that they're now UTC), meaning datetime
+        # comparisons don't work against timestamps from the HabitRPG API,
+        # which do include timezone information.  Newer versions keep the UTC
+        # offset, so leave those timestamps alone.
         #
         # Do this even for timestamps we don't use, because YAML's dumper does
         # at least preserve the UTC offset if it's stored in the datetime
         # object, so we might as well keep that information handy.
-        try:
-            task_data['current']['created'] = (task_data['current']['created']
-                    .replace(tzinfo=datetime.timezone.utc))
-        except TypeError:  # task_data['current'] == None
-            pass
-        try:
-            task_data['next'] = (task_data['next']
-                    .replace(tzinfo=datetime.timezone.utc))
-        except AttributeError:  # task_data['next'] == None
-            pass
-        try:
-            task_data['previous']['created'] = (task_data['previous']
-                    ['created'].replace(tzinfo=datetime.timezone.utc))
-        except TypeError:  # task_data['previous'] == None
-            pass
-        try:
-            task_data['previous']['completed'] = (task_data['previous']
-                    ['completed'].replace(tzinfo=datetime.timezone.utc))
-        except (TypeError, KeyError):  # task_data['previous'] == None
-            pass
+        if task_data['current'] is not None:
+            task_data['current']['created'] = as_utc(
+                    task_data['current']['created'])
+        task_data['next'] = as_utc(task_data['next'])
+        if task_data['previous'] is not None:
+            task_data['previous']['created'] = as_utc(
+                    task_data['previous']['created'])
+            if 'completed' in task_data['previous']:
+                task_data['previous']['completed'] = as_utc(
+                        task_data['previous']['completed'])
 
         # Add a notes field if there isn't one already -- needed for back
         # compatibility.
@@ -139,9 +167,13 @@ if __name__ == '__main__':
             task_data['unit multiplier'] = UNIT_MULTIPLIER['days']
 
         if task_data['current'] is not None:
-            task = habitrpg.Todo(user, task_data['current']['id'])
+            task = todos.get(task_data['current']['id'])
             try:
-                task.fetch()
+                if task is None:
+                    # The task isn't in the list we fetched at the start, so
+                    # fetch it directly to find out whether it still exists.
+                    task = habitrpg.Todo(user, task_data['current']['id'])
+                    task.fetch()
             except habitrpg.requests.exceptions.HTTPError as ex:
                 if ex.response.status_code != 404:
                     raise ex
@@ -149,7 +181,7 @@ if __name__ == '__main__':
                 task_data['current'] = None
                 min_seconds = task_data['repeat']['on deletion']['min'] * task_data['unit multiplier']
                 max_seconds = task_data['repeat']['on deletion']['max'] * task_data['unit multiplier']
-                task_data['next'] = (datetime.datetime.now(TZ) +
+                task_data['next'] = (now +
                         datetime.timedelta(seconds=randint(min_seconds,
                                                            max_seconds)))
             else:
@@ -170,8 +202,9 @@ if __name__ == '__main__':
                         raise
                     task_data['next'] = next_time
         if (task_data['next'] is not None and
-                datetime.datetime.now(TZ) >= task_data['next']):
-            recurring_tag = get_recurring_tag(user)
+                now >= task_data['next']):
+            if recurring_tag is None:
+                recurring_tag = get_recurring_tag(user)
             if task_data['checklist']:
                 checklist = ((text, False) for text in task_data['checklist'])
             else:
@@ -184,11 +217,19 @@ if __name__ == '__main__':
                                     'created': task.date_created}
             task_data['next'] = None
 
+        # Most runs don't change most tasks, so only rewrite the file if its
+        # contents would actually be different.  Comparing the output rather
+        # than tracking every change means the back compatibility fixes above
+        # still get saved.
+        task_yaml = dump_task_data(task_data)
+        if task_yaml == old_task_yaml:
+            continue
+
         # Write to a temporary file then move it into place, else something
         # going wrong while writing the file will clobber the old data there
         # too.
         temp_handle, temp_path = mkstemp(suffix='.tmp', prefix='.',
                                          dir=TASK_DIRECTORY)
-        with os.fdopen(temp_handle, 'w') as task_file:
-            yaml.safe_dump(task_data, task_file, default_flow_style=False)
-        os.rename(temp_path, file_path)
+        with os.fdopen(temp_handle, 'wb') as task_file:
+            task_file.write(task_yaml)
+        os.replace(temp_path, file_path)